@@ -1,8 +1,17 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
-from datetime import timedelta
+import os
+import queue
+import threading
+import traceback
+from types import MappingProxyType
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from datetime import datetime, timedelta, timezone
 from importlib import import_module
+import click
 from flask import Flask, request, url_for, render_template, session, flash, redirect
+from flask.logging import default_handler
+from pythonjsonlogger.orjson import OrjsonFormatter
 from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf.csrf import CSRFProtect
@@ -17,36 +26,138 @@ oauth = OAuth()
 csrf = CSRFProtect()
 migrate = Migrate()
 
+log_queue = queue.Queue(-1)
+
+ERROR_MESSAGES = MappingProxyType({
+    400: "Bad Request - The server cannot process your request.",
+    401: "Authentication Required - Please log in to continue.",
+    403: "Access Denied - You don't have permission to access this resource.",
+    404: "Page Not Found - The requested resource doesn't exist or has been moved.",
+    429: "Too Many Requests - Please wait a moment before trying again.",
+    500: "Internal Server Error - Something went wrong on our end.",
+    502: "Bad Gateway - We're having trouble connecting to our services.",
+    503: "Service Unavailable - We're temporarily unavailable. Please try again later.",
+    504: "Gateway Timeout - The server took too long to respond."
+})
+DEFAULT_ERROR_MESSAGE = "An unexpected error has occurred."
+
+SESSION_LIFETIME = timedelta(seconds=28800)
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that buffers writes instead of flushing on every record.
+
+    The buffer is flushed every ``flush_interval`` seconds by a background thread, on
+    rollover and on close. The file size is tracked in memory because the stdlib
+    ``shouldRollover`` calls ``seek``/``tell``, which flush the stream on every record.
+    """
+
+    def __init__(self, *args, buffer_size=65536, flush_interval=1.0, **kwargs):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._bytes_written = 0
+        self._pending_bytes = 0
+        self._closing = threading.Event()
+        super().__init__(*args, **kwargs)
+        self._flush_thread = threading.Thread(target=self._flush_loop, name='log-flush', daemon=True)
+        self._flush_thread.start()
+
+    def _open(self):
+        stream = open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                      encoding=self.encoding, errors=self.errors)
+        # Called on startup and after every rollover, so the counter restarts from the real file size
+        self._bytes_written = os.path.getsize(self.baseFilename)
+        return stream
+
+    def shouldRollover(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes <= 0:
+            return False
+        msg = self.format(record) + self.terminator
+        self._pending_bytes = len(msg.encode(self.encoding or 'utf-8', 'replace'))
+        return self._bytes_written + self._pending_bytes >= self.maxBytes
+
+    def emit(self, record):
+        super().emit(record)
+        self._bytes_written += self._pending_bytes
+        self._pending_bytes = 0
+
+    def flush(self):
+        # Skip the per-record flush; the flush thread and close() write the buffer out
+        pass
+
+    def force_flush(self):
+        super().flush()
+
+    def _flush_loop(self):
+        while not self._closing.wait(self.flush_interval):
+            self.force_flush()
+
+    def close(self):
+        self._closing.set()
+        self.force_flush()
+        super().close()
+
+
+def json_formatter():
+    # Field names match what GCP structured logging expects; `extra` fields are merged in
+    return OrjsonFormatter('%(asctime)s %(levelname)s %(name)s %(message)s',
+                           rename_fields={'asctime': 'timestamp', 'levelname': 'severity'})
+
 
 def setup_logging(app):
     if not Config.DEBUG:
+        default_handler.setFormatter(json_formatter())
         app.logger.setLevel(logging.INFO)
     else:
         try:
-            handler = RotatingFileHandler("app.log", maxBytes=100000)
+            handler = BufferedRotatingFileHandler("app.log", maxBytes=50 * 1024 * 1024, backupCount=5)
             handler.setLevel(logging.INFO)
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            handler.setFormatter(formatter)
-            app.logger.addHandler(handler)
+            handler.setFormatter(json_formatter())
+            # Formatting and file writes happen on the listener thread so request handlers only enqueue records
+            listener = QueueListener(log_queue, handler, respect_handler_level=True)
+            listener.start()
+            # atexit runs in reverse order: stop the listener first, then flush and close the file
+            atexit.register(handler.close)
+            atexit.register(listener.stop)
+            app.logger.addHandler(QueueHandler(log_queue))
             app.logger.setLevel(logging.DEBUG)
         except Exception as e:
             print(f"Warning: Could not set up file logging: {e}")
             console_handler = logging.StreamHandler()
             console_handler.setLevel(logging.INFO)
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            console_handler.setFormatter(formatter)
+            console_handler.setFormatter(json_formatter())
             app.logger.addHandler(console_handler)
             app.logger.setLevel(logging.DEBUG)
 
 
+LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'warning': logging.WARNING,
+    'error': logging.ERROR
+}
+
+
 def log_exception(logger, context, exception, level='error'):
-    log_message = f"{context}: {str(exception)}"
-    if level == 'debug':
-        logger.debug(log_message)
-    elif level == 'warning':
-        logger.warning(log_message)
-    else:
-        logger.error(log_message)
+    log_level = LOG_LEVELS.get(level, logging.ERROR)
+    if not logger.isEnabledFor(log_level):
+        return
+    logger.log(log_level, '%s: %s', context, exception)
+
+
+def datetimeformat(value, format='%Y-%m-%d %H:%M:%S'):
+    """Jinja filter formatting a datetime or unix timestamp (seconds, UTC)."""
+    try:
+        if isinstance(value, (int, float)):
+            dt = datetime.fromtimestamp(value, timezone.utc)
+        elif isinstance(value, datetime):
+            dt = value
+        else:
+            return value
+        return dt.strftime(format)
+    except Exception:
+        return value
 
 
 def redirect_url(default='global.index'):
@@ -67,57 +178,49 @@ def register_blueprints(app):
         app.register_blueprint(module.blueprint)
 
 
+def register_commands(app):
+
+    @app.cli.command('backfill-email-hash')
+    def backfill_email_hash():
+        """Populate users.email_hash for rows created before the column existed."""
+        from app.models.user import UserModel
+        count = UserModel.backfill_email_hashes()
+        click.echo(f"Backfilled email_hash for {count} users")
+
+
 def configure_database(app):
-    with app.app_context():
-        try:
-            db.create_all()
-        except Exception as e:
-            log_exception(app.logger, "Configuring Database", e)
+    # Schema changes are applied with `flask db migrate` / `flask db upgrade`, not at startup.
+    # Flask-SQLAlchemy removes the scoped session itself on app context teardown.
 
     @app.teardown_request
-    def shutdown_session(exception=None):
+    def log_request_exception(exception=None):
         if exception:
-            log_exception(app.logger, "Database Session Shutdown", exception, level='debug')
-        db.session.remove()
+            log_exception(app.logger, "Request Teardown", exception, level='debug')
 
 
 def create_app(config):
     app = Flask(__name__)
     app.config.from_object(config)
+    app.permanent_session_lifetime = SESSION_LIFETIME
     register_extensions(app)
     register_blueprints(app)
+    register_commands(app)
     configure_database(app)
     setup_logging(app)
 
-    # Register custom datetimeformat filter for Jinja
-    def datetimeformat(value, format='%Y-%m-%d %H:%M:%S'):
-        import datetime
-        try:
-            if isinstance(value, (int, float)):
-                # Assume unix timestamp (seconds)
-                dt = datetime.datetime.utcfromtimestamp(value)
-            elif isinstance(value, datetime.datetime):
-                dt = value
-            else:
-                return value
-            return dt.strftime(format)
-        except Exception:
-            return value
-
     app.jinja_env.filters['datetimeformat'] = datetimeformat
 
     @app.before_request
     def make_session_permanent():
         session.permanent = True
-        app.permanent_session_lifetime = timedelta(seconds=28800)
 
 
     @app.errorhandler(Exception)
     def handle_error(e):
         try:
             # Get detailed traceback info
-            import traceback, json
             tb = traceback.format_exc()
+            message = str(e)
 
             request_info = {
                 'url': request.url,
@@ -127,32 +230,16 @@ def create_app(config):
                 'args': dict(request.args)
             }
 
-            # Structure the error for GCP logging
-            error_dict = {
-                'severity': 'ERROR',
+            # Structured fields are serialized by the handler's JSON formatter
+            app.logger.error(message or "Unhandled exception", extra={
                 'exception_type': type(e).__name__,
-                'message': str(e),
                 'request': request_info,
                 'traceback': tb
-            }
-
-            # Log as JSON for GCP structured logging
-            app.logger.error(json.dumps(error_dict))
+            })
 
             status_code = getattr(e, 'code', 500)
-            error_messages = {
-                400: "Bad Request - The server cannot process your request.",
-                401: "Authentication Required - Please log in to continue.",
-                403: "Access Denied - You don't have permission to access this resource.",
-                404: "Page Not Found - The requested resource doesn't exist or has been moved.",
-                429: "Too Many Requests - Please wait a moment before trying again.",
-                500: "Internal Server Error - Something went wrong on our end.",
-                502: "Bad Gateway - We're having trouble connecting to our services.",
-                503: "Service Unavailable - We're temporarily unavailable. Please try again later.",
-                504: "Gateway Timeout - The server took too long to respond."
-            }
-            error_message = error_messages.get(status_code, "An unexpected error has occurred.")
-            error_details = str(e) if str(e) and str(e) != error_message else None
+            error_message = ERROR_MESSAGES.get(status_code, DEFAULT_ERROR_MESSAGE)
+            error_details = message if message and message != error_message else None
             if status_code == 401:
                 flash('Authentication Required - Please log in to continue.', 'error')
                 return redirect(url_for('user.login'))
@@ -23,13 +23,16 @@ class ProductionConfig(Config):
 
     if Config.PROD_TARGET == 'gae':
         # Google App Engine F4 (2.4GB RAM, 4 vCPUs)
-        # GAE has connection limits and auto-scaling considerations
+        # GAE has connection limits and auto-scaling considerations:
+        # keep (pool_size + max_overflow) * max instances <= Cloud SQL max_connections
         SQLALCHEMY_ENGINE_OPTIONS = {
-            'pool_size': 5,  # Conservative for GAE connection limits
-            'max_overflow': 5,  # Total 10 connections max per instance
-            'pool_timeout': 30,  # Fail fast in serverless environment
-            'pool_recycle': 3600,  # 1 hour (GAE handles most connection issues)
-            'pool_pre_ping': True  # Important for GAE's connection management
+            'pool_size': 10,
+            'max_overflow': 10,  # Total 20 connections max per instance
+            'pool_timeout': 10,  # Fail fast in serverless environment
+            # GAE/Cloud SQL drops idle connections after ~10 minutes, so recycle well inside
+            # that window instead of paying a pre-ping round trip on every checkout
+            'pool_recycle': 300,  # 5 minutes
+            'pool_pre_ping': False
         }
 
         SQLALCHEMY_DATABASE_URI = '{}://{}:{}@/{}?unix_socket=/cloudsql/{}'.format(
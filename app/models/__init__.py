@@ -1,12 +1,15 @@
+import functools
 import logging
-import json
+import orjson
 import pytz
+import threading
+import time
 from datetime import datetime
 from decimal import Decimal
 from flask import abort, current_app
-from sqlalchemy import ForeignKey as sa_foreign_key
+from sqlalchemy import ForeignKey as sa_foreign_key, event as sa_event
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import relationship as sa_relationship, Mapped as sa_mapped
+from sqlalchemy.orm import relationship as sa_relationship, Mapped as sa_mapped, Session, object_session
 from sqlalchemy.orm.state import InstanceState
 import sqlalchemy.schema as sa_schema
 import sqlalchemy.types as sa_type
@@ -17,17 +20,59 @@ from app.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Process-local cache of AdminSettings values: key -> (cached_at, value)
+SETTINGS_CACHE_TTL = 60
+_SETTINGS_CACHE = {}
+# Bumped on every invalidation so a lookup that raced a commit doesn't store the pre-commit value
+_settings_cache_generation = 0
+_settings_cache_lock = threading.Lock()
+
+
+def _coerce(value):
+    if isinstance(value, datetime):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+_TRUE_VALUES = frozenset(('1', 'true', 'yes', 'on', 't', 'y'))
+_FALSE_VALUES = frozenset(('0', 'false', 'no', 'off', 'f', 'n'))
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return bool(value)
+    val = value.strip().lower() if isinstance(value, str) else str(value).lower()
+    if val in _TRUE_VALUES:
+        return True
+    if val in _FALSE_VALUES:
+        return False
+    raise ValueError(f'Cannot cast {value} to boolean')
+
+
+_SETTING_CASTERS = {
+    'int': int,
+    'float': float,
+    'boolean': _to_bool
+}
+
+
 class FlaskModel(db.Model):
 
     __abstract__ = True
 
     def __init__(self, **kwargs):
         for property, value in kwargs.items():
-            if hasattr(value, '__iter__') and not isinstance(value, str):
-                value = value[0]
-
             setattr(self, property, value)
 
+    @classmethod
+    def from_formdata(cls, formdata):
+        """Build a model from form data, unwrapping single-item lists (e.g. MultiDict.to_dict(flat=False))."""
+        return cls(**{k: (v[0] if isinstance(v, (list, tuple)) else v) for k, v in formdata.items()})
+
     def save(self) -> None:
         try:
             db.session.add(self)
@@ -77,38 +122,10 @@ class FlaskModel(db.Model):
             db.session.close()
 
     def json(self):
-        readd_instance_state = False
-        readd_instance_state_value = None
-        for member in list(self.__dict__):
-            if isinstance(self.__dict__[member], datetime):
-                self.__dict__[member] = str(self.__dict__[member])
-            elif isinstance(self.__dict__[member], InstanceState):
-                readd_instance_state = True
-                readd_instance_state_value = self.__dict__[member]
-                del self.__dict__[member]
-            elif isinstance(self.__dict__[member], Decimal):
-                self.__dict__[member] = float(self.__dict__[member])
-        result = json.loads(json.dumps(self.__dict__))
-        if readd_instance_state:
-            self.__dict__['_sa_instance_state'] = readd_instance_state_value
-        return result
+        return {k: _coerce(v) for k, v in self.__dict__.items() if not isinstance(v, InstanceState)}
 
     def dumped_json(self):
-        readd_instance_state = False
-        readd_instance_state_value = None
-        for member in list(self.__dict__):
-            if isinstance(self.__dict__[member], datetime):
-                self.__dict__[member] = str(self.__dict__[member])
-            elif isinstance(self.__dict__[member], InstanceState):
-                readd_instance_state = True
-                readd_instance_state_value = self.__dict__[member]
-                del self.__dict__[member]
-            elif isinstance(self.__dict__[member], Decimal):
-                self.__dict__[member] = float(self.__dict__[member])
-        result = json.loads(json.dumps(self.__dict__))
-        if readd_instance_state:
-            self.__dict__['_sa_instance_state'] = readd_instance_state_value
-        return json.dumps(result)
+        return orjson.dumps(self.json()).decode()
 
 
 class CacheCompatibleEncryptedType(EncryptedType):
@@ -142,11 +159,14 @@ class DatabaseConstant:
     JSON = sa_type.JSON
     TEXT = sa_type.TEXT
 
+    # Type objects are stateless, so columns with the same arguments share one instance
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def DECIMAL(precision=65, scale=2):
         return sa_type.DECIMAL(precision, scale)
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def STRING(length):
         return sa_type.String(length)
 
@@ -167,34 +187,28 @@ class AdminSettings(db.Model, FlaskModel):
 
     @staticmethod
     def _cast_value_to_type(value, datatype):
-        if datatype == 'int':
-            return int(value)
-        elif datatype == 'float':
-            return float(value)
-        elif datatype == 'boolean':
-            if isinstance(value, bool):
-                return value
-            if isinstance(value, int):
-                return bool(value)
-            val = str(value).strip().lower()
-            if val in ['1', 'true', 'yes', 'on']:
-                return True
-            elif val in ['0', 'false', 'no', 'off']:
-                return False
-            else:
-                raise ValueError(f'Cannot cast {value} to boolean')
-        else:
-            return str(value)
+        return _SETTING_CASTERS.get(datatype, str)(value)
 
     @classmethod
     def get_setting(cls, key, default=None):
-        """Get a setting value by key, cast to its datatype if found."""
+        """Get a setting value by key, cast to its datatype if found.
+
+        Values are cached per process for SETTINGS_CACHE_TTL seconds.
+        """
+        cached = _SETTINGS_CACHE.get(key)
+        if cached and time.monotonic() - cached[0] < SETTINGS_CACHE_TTL:
+            return cached[1]
+        generation = _settings_cache_generation
         setting = cls.query.filter_by(key=key).first()
         if setting:
             try:
-                return cls._cast_value_to_type(setting.value, setting.datatype)
+                value = cls._cast_value_to_type(setting.value, setting.datatype)
             except Exception:
                 return default
+            with _settings_cache_lock:
+                if generation == _settings_cache_generation:
+                    _SETTINGS_CACHE[key] = (time.monotonic(), value)
+            return value
         return default
 
     @classmethod
@@ -221,4 +235,24 @@ class AdminSettings(db.Model, FlaskModel):
         setting = cls(key=key, value=str(casted), datatype=datatype, description=description)
         db.session.add(setting)
         db.session.commit()
-        return setting
\ No newline at end of file
+        return setting
+
+
+# Any flushed insert/update/delete of an AdminSettings row (including via FlaskModel.save()/delete())
+# flags the session; the whole cache is dropped once that transaction commits or rolls back. Clearing
+# everything rather than one key also covers renamed settings, whose old key may not be loaded.
+@sa_event.listens_for(AdminSettings, 'after_insert')
+@sa_event.listens_for(AdminSettings, 'after_update')
+@sa_event.listens_for(AdminSettings, 'after_delete')
+def _mark_settings_changed(mapper, connection, target):
+    object_session(target).info['admin_settings_changed'] = True
+
+
+@sa_event.listens_for(Session, 'after_commit')
+@sa_event.listens_for(Session, 'after_rollback')
+def _invalidate_settings_cache(session):
+    global _settings_cache_generation
+    if session.info.pop('admin_settings_changed', False):
+        with _settings_cache_lock:
+            _settings_cache_generation += 1
+            _SETTINGS_CACHE.clear()
@@ -1,14 +1,32 @@
+import hashlib
+import hmac
 from flask_login import UserMixin
-from app import login_manager
+from sqlalchemy.orm import validates
+from app import db, login_manager
 from app.models import FlaskModel, DatabaseConstant, CacheCompatibleEncryptedType
+from app.config import Config
 
 
 @login_manager.user_loader
 def user_loader(user_id) -> "UserModel":
-    user = UserModel.get_user_by_id(user_id)
+    # Flask-Login stores the id as a string; cast it so the identity map lookup matches
+    try:
+        _id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    user = UserModel.get_user_by_id(_id)
     return user
 
 
+# Subkey derived from ENCRYPTION_KEY so the email hash never reuses the AES column key directly
+_EMAIL_HASH_KEY = hmac.new(Config.ENCRYPTION_KEY.encode(), b'email_hash', hashlib.sha256).digest()
+
+
+def hash_email_address(email_address) -> str:
+    # Keyed so the hashes can't be reversed with a dictionary attack without the encryption key
+    return hmac.new(_EMAIL_HASH_KEY, email_address.encode(), hashlib.sha256).hexdigest()
+
+
 class UserModel(FlaskModel, UserMixin):
 
     __tablename__ = 'users'
@@ -32,6 +50,8 @@ class UserModel(FlaskModel, UserMixin):
             DatabaseConstant.AES_ENGINE,
             DatabaseConstant.PKCS5
         ), nullable=False)
+    # HMAC-SHA256 of email_address, indexed for lookups (the encrypted column is a BLOB)
+    email_hash = DatabaseConstant.COLUMN(DatabaseConstant.STRING(64), nullable=False, index=True, unique=True)
     password = DatabaseConstant.COLUMN(
         CacheCompatibleEncryptedType(
             DatabaseConstant.STRING(255),
@@ -40,10 +60,24 @@ class UserModel(FlaskModel, UserMixin):
             DatabaseConstant.PKCS5
         ), nullable=True)
 
+    @validates('email_address')
+    def validate_email_address(self, key, email_address):
+        self.email_hash = hash_email_address(email_address)
+        return email_address
+
     @classmethod
     def get_user_by_id(cls, _id) -> "UserModel":
-        return cls.query.filter_by(id=_id).first()
+        return db.session.get(cls, _id)
 
     @classmethod
     def get_user_by_email_address(cls, email_address) -> "UserModel":
-        return cls.query.filter_by(email_address=email_address).first()
+        return cls.query.filter_by(email_hash=hash_email_address(email_address)).first()
+
+    @classmethod
+    def backfill_email_hashes(cls) -> int:
+        """Populate email_hash for users created before the column existed."""
+        users = cls.query.filter(cls.email_hash.is_(None)).all()
+        for user in users:
+            user.email_hash = hash_email_address(user.email_address)
+        db.session.commit()
+        return len(users)